@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
-import io
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
 # Configure the page
 st.set_page_config(
@@ -13,7 +13,7 @@ st.set_page_config(
 )
 
 # Custom CSS for modern styling
-st.markdown("""
+_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -30,7 +30,7 @@ st.markdown("""
         border-bottom: 2px solid #e5e7eb;
         padding-bottom: 0.5rem;
     }
-    .metric-container {
+    [data-testid="stMetric"] {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
         padding: 1.5rem;
         border-radius: 12px;
@@ -38,14 +38,19 @@ st.markdown("""
         text-align: center;
         color: white;
     }
-    .metric-value {
+    [data-testid="stMetricValue"] {
         font-size: 2rem;
         font-weight: bold;
         margin-bottom: 0.5rem;
+        color: white;
     }
-    .metric-label {
-        font-size: 0.9rem;
+    [data-testid="stMetricLabel"] {
         opacity: 0.9;
+        justify-content: center;
+    }
+    [data-testid="stMetricLabel"] p {
+        font-size: 0.9rem;
+        color: white;
     }
     .upload-section {
         background: #f8fafc;
@@ -62,38 +67,102 @@ st.markdown("""
         margin: 1rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(_CSS, unsafe_allow_html=True)
+
+class BookingDataError(Exception):
+    """Uploaded CSV failed structure or content validation"""
+
+@st.cache_data(show_spinner=False)
+def load_df(file_bytes: bytes) -> pd.DataFrame:
+    """Read, validate and clean the uploaded CSV"""
+    # Multithreaded Arrow parser reading bounded blocks straight from the upload buffer
+    table = pacsv.read_csv(
+        pa.BufferReader(file_bytes),
+        read_options=pacsv.ReadOptions(block_size=8 << 20),
+        # Read empty cells as nulls (like pd.read_csv) so dropna() removes them
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+    )
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    
+    # Validate CSV structure
+    expected_columns = ['Hotel Country Name', 'Guests', 'Room Nights']
+    if len(df.columns) != 3:
+        raise BookingDataError(f'Invalid file format: Expected 3 columns, found {len(df.columns)}')
+    
+    # Rename columns to expected format
+    df.columns = expected_columns
+    
+    # Validate and clean data
+    try:
+        # Columns Arrow could not type as numbers still need coercing
+        for column in ['Guests', 'Room Nights']:
+            if not pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = pd.to_numeric(df[column].astype('string[pyarrow]'), errors='coerce', dtype_backend='pyarrow')
+    except:
+        raise BookingDataError('Data validation failed: Guests and Room Nights must be numeric values')
+    
+    # Remove invalid data
+    df = df.dropna()
+    
+    # Guests and nights are small integers; int32 halves the bytes aggregated
+    df = df.astype({'Guests': 'int32[pyarrow]', 'Room Nights': 'int32[pyarrow]'}, errors='ignore')
+    
+    if df.empty:
+        raise BookingDataError('No valid data found after processing')
+    
+    # Group on integer category codes instead of hashing country strings
+    df['Hotel Country Name'] = df['Hotel Country Name'].astype('category')
+    
+    return df
 
 def analyze_booking_data(df):
     """Analyze booking data and return comprehensive statistics"""
-    # Group by country and calculate metrics
-    country_analysis = df.groupby('Hotel Country Name').agg({
-        'Guests': ['count', 'mean', 'sum'],
-        'Room Nights': ['mean', 'sum']
-    }).round(2)
-    
-    # Flatten column names
-    country_analysis.columns = ['Total_Bookings', 'Avg_Guests', 'Total_Guests', 'Avg_Stay_Nights', 'Total_Nights']
+    # Group by country and calculate metrics (ranking is done by the sort below)
+    country_analysis = df.groupby('Hotel Country Name', sort=False, observed=True).agg(
+        Total_Bookings=('Guests', 'size'),
+        Avg_Guests=('Guests', 'mean'),
+        Total_Guests=('Guests', 'sum'),
+        Avg_Stay_Nights=('Room Nights', 'mean'),
+        Total_Nights=('Room Nights', 'sum')
+    ).round(2)
     country_analysis = country_analysis.reset_index()
     
+    # Back to Arrow strings so the table search uses Arrow's string kernels
+    country_analysis['Hotel Country Name'] = country_analysis['Hotel Country Name'].astype('string[pyarrow]')
+    
     # Sort by total bookings for ranking
     country_analysis = country_analysis.sort_values('Total_Bookings', ascending=False)
     
+    # Market share columns need the full country list
+    country_analysis['Booking_Percentage'] = (country_analysis['Total_Bookings'] / country_analysis['Total_Bookings'].sum() * 100).round(2)
+    country_analysis['Guest_Percentage'] = (country_analysis['Total_Guests'] / country_analysis['Total_Guests'].sum() * 100).round(2)
+    
     analysis = {
         'total_bookings': len(df),
         'total_countries': len(country_analysis),
-        'total_guests': df['Guests'].sum(),
-        'avg_stay': df['Room Nights'].mean(),
+        # Totals derived from the per-country sums rather than rescanning df
+        'total_guests': country_analysis['Total_Guests'].sum(),
+        'avg_stay': country_analysis['Total_Nights'].sum() / country_analysis['Total_Bookings'].sum(),
         'country_data': country_analysis,
         'top_country': country_analysis.iloc[0]['Hotel Country Name'] if not country_analysis.empty else 'N/A'
     }
     
     return analysis
 
+@st.cache_data(show_spinner=False)
+def compute_analysis(df_hash_key, _df):
+    """Cached analysis keyed on the source file (the underscored frame is not hashed)"""
+    return analyze_booking_data(_df)
+
+@st.cache_resource
 def create_interactive_map(analysis):
     """Create modern interactive choropleth map with improved styling"""
     country_data = analysis['country_data']
     
+    # Per-country hover values as one 2D array, formatted by Plotly client-side
+    customdata = country_data[['Avg_Guests', 'Avg_Stay_Nights', 'Total_Guests']].to_numpy(dtype='float64')
+    
     # Create the choropleth map with modern color scheme
     fig = go.Figure(data=go.Choropleth(
         locations=country_data['Hotel Country Name'],
@@ -109,12 +178,13 @@ def create_interactive_map(analysis):
         ],
         autocolorscale=False,
         text=country_data['Hotel Country Name'],
+        customdata=customdata,
         hovertemplate=
         '<b>%{text}</b><br>' +
         'Total Bookings: %{z:,}<br>' +
-        'Average Guests: ' + country_data['Avg_Guests'].astype(str) + '<br>' +
-        'Average Stay: ' + country_data['Avg_Stay_Nights'].astype(str) + ' nights<br>' +
-        'Total Guests: ' + country_data['Total_Guests'].astype(str) +
+        'Average Guests: %{customdata[0]:.2f}<br>' +
+        'Average Stay: %{customdata[1]:.2f} nights<br>' +
+        'Total Guests: %{customdata[2]:,}' +
         '<extra></extra>',
         colorbar=dict(
             title=dict(
@@ -153,41 +223,51 @@ def create_interactive_map(analysis):
     
     return fig
 
+@st.cache_resource
+def create_top10_bar(top_10):
+    """Create horizontal bar chart of the top countries by bookings"""
+    bar_fig = go.Figure(go.Bar(
+        x=top_10['Total_Bookings'].to_numpy(),
+        y=top_10['Hotel Country Name'].to_numpy(),
+        orientation='h',
+        marker=dict(
+            color=top_10['Total_Bookings'].to_numpy(),
+            colorscale=[
+                [0, '#f1f5f9'],
+                [0.5, '#64748b'],
+                [1, '#1e293b']
+            ],
+            showscale=True,
+            colorbar=dict(title=dict(text='Total Bookings'))
+        ),
+        hovertemplate='Country: %{y}<br>Total Bookings: %{x:,}<extra></extra>'
+    ))
+    
+    bar_fig.update_layout(
+        height=400,
+        showlegend=False,
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color='#374151'),
+        xaxis=dict(title=dict(text='Total Bookings')),
+        yaxis=dict(title=dict(text='Country'), categoryorder='total ascending')
+    )
+    
+    return bar_fig
+
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(df):
+    """Serialize a DataFrame to UTF-8 CSV bytes for download"""
+    return df.to_csv(index=False).encode('utf-8')
+
 def create_metrics_cards(analysis):
     """Create modern metric cards"""
     col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        st.markdown(f"""
-        <div class="metric-container">
-            <div class="metric-value">{analysis['total_bookings']:,}</div>
-            <div class="metric-label">Total Bookings</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
-        <div class="metric-container">
-            <div class="metric-value">{analysis['total_countries']}</div>
-            <div class="metric-label">Countries</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-        <div class="metric-container">
-            <div class="metric-value">{analysis['total_guests']:,}</div>
-            <div class="metric-label">Total Guests</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown(f"""
-        <div class="metric-container">
-            <div class="metric-value">{analysis['avg_stay']:.1f}</div>
-            <div class="metric-label">Avg Stay (nights)</div>
-        </div>
-        """, unsafe_allow_html=True)
+    col1.metric("Total Bookings", f"{analysis['total_bookings']:,}")
+    col2.metric("Countries", f"{analysis['total_countries']}")
+    col3.metric("Total Guests", f"{analysis['total_guests']:,}")
+    col4.metric("Avg Stay (nights)", f"{analysis['avg_stay']:.1f}")
 
 def main():
     # Main header
@@ -215,35 +295,15 @@ def main():
     
     if uploaded_file is not None:
         try:
-            # Read and validate data
-            df = pd.read_csv(uploaded_file)
-            
-            # Validate CSV structure
-            expected_columns = ['Hotel Country Name', 'Guests', 'Room Nights']
-            if len(df.columns) != 3:
-                st.error(f'Invalid file format: Expected 3 columns, found {len(df.columns)}')
-                return
-            
-            # Rename columns to expected format
-            df.columns = expected_columns
-            
-            # Validate and clean data
+            # Read, validate and analyze data (cached across reruns)
+            file_bytes = uploaded_file.getvalue()
             try:
-                df['Guests'] = pd.to_numeric(df['Guests'], errors='coerce')
-                df['Room Nights'] = pd.to_numeric(df['Room Nights'], errors='coerce')
-            except:
-                st.error('Data validation failed: Guests and Room Nights must be numeric values')
-                return
-            
-            # Remove invalid data
-            df = df.dropna()
-            
-            if df.empty:
-                st.error('No valid data found after processing')
+                df = load_df(file_bytes)
+            except BookingDataError as e:
+                st.error(str(e))
                 return
             
-            # Analyze data
-            analysis = analyze_booking_data(df)
+            analysis = compute_analysis(file_bytes, df)
             
             # Success message
             st.success(f"Successfully processed {uploaded_file.name}")
@@ -261,29 +321,7 @@ def main():
             st.markdown('<h3 class="section-header">Top 10 Countries by Bookings</h3>', unsafe_allow_html=True)
             top_10 = analysis['country_data'].head(10)
             
-            bar_fig = px.bar(
-                top_10, 
-                x='Total_Bookings', 
-                y='Hotel Country Name',
-                orientation='h',
-                color='Total_Bookings',
-                color_continuous_scale=[
-                    [0, '#f1f5f9'],
-                    [0.5, '#64748b'],
-                    [1, '#1e293b']
-                ],
-                labels={'Total_Bookings': 'Total Bookings', 'Hotel Country Name': 'Country'}
-            )
-            
-            bar_fig.update_layout(
-                height=400,
-                showlegend=False,
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                font=dict(color='#374151'),
-                yaxis=dict(categoryorder='total ascending')
-            )
-            
+            bar_fig = create_top10_bar(top_10)
             st.plotly_chart(bar_fig, use_container_width=True)
             
             # Detailed statistics table
@@ -298,17 +336,17 @@ def main():
             with col3:
                 sort_order = st.selectbox("Order", ["Descending", "Ascending"])
             
-            # Filter and sort data with additional analysis columns
-            filtered_df = analysis['country_data'].copy()
-            
-            # Add interesting analysis columns
-            filtered_df['Booking_Percentage'] = (filtered_df['Total_Bookings'] / filtered_df['Total_Bookings'].sum() * 100).round(2)
-            filtered_df['Guest_Percentage'] = (filtered_df['Total_Guests'] / filtered_df['Total_Guests'].sum() * 100).round(2)
-            filtered_df['Revenue_Score'] = (filtered_df['Total_Bookings'] * filtered_df['Avg_Stay_Nights'] * filtered_df['Avg_Guests']).round(2)
-            filtered_df['Occupancy_Intensity'] = (filtered_df['Total_Guests'] / filtered_df['Total_Nights']).round(2)
+            # Filter first so per-row analysis columns only cover matching countries
+            filtered_df = analysis['country_data']
             
             if search_country:
-                filtered_df = filtered_df[filtered_df['Hotel Country Name'].str.contains(search_country, case=False, na=False)]
+                filtered_df = filtered_df[filtered_df['Hotel Country Name'].str.contains(search_country, case=False, na=False, regex=False)]
+            
+            # Add interesting analysis columns
+            filtered_df = filtered_df.assign(
+                Revenue_Score=(filtered_df['Total_Bookings'] * filtered_df['Avg_Stay_Nights'] * filtered_df['Avg_Guests']).round(2),
+                Occupancy_Intensity=(filtered_df['Total_Guests'] / filtered_df['Total_Nights']).round(2)
+            )
             
             # Apply sorting
             sort_column_map = {
@@ -327,8 +365,7 @@ def main():
                 st.info(f"Showing {len(filtered_df)} of {len(analysis['country_data'])} countries")
                 
                 # Create comprehensive display dataframe
-                display_table_df = filtered_df.copy()
-                display_table_df = display_table_df.rename(columns={
+                display_table_df = filtered_df.rename(columns={
                     'Hotel Country Name': 'Country',
                     'Total_Bookings': 'Total Bookings',
                     'Avg_Guests': 'Avg Guests',
@@ -380,9 +417,10 @@ def main():
                     avg_guests_per_night = display_table_df['Guests/Night'].mean()
                     st.write(f"👥 Average occupancy: {avg_guests_per_night:.2f} guests per night")
             
-            # Format the dataframe
-            display_df = analysis['country_data'].copy()
-            display_df = display_df.rename(columns={
+            # Export dataframe keeps numeric columns; the table handles display formatting
+            display_df = analysis['country_data'][[
+                'Hotel Country Name', 'Total_Bookings', 'Avg_Guests', 'Total_Guests', 'Avg_Stay_Nights', 'Total_Nights'
+            ]].rename(columns={
                 'Hotel Country Name': 'Country',
                 'Total_Bookings': 'Total Bookings',
                 'Avg_Guests': 'Avg Guests',
@@ -391,19 +429,12 @@ def main():
                 'Total_Nights': 'Total Nights'
             })
             
-            # Format numbers for better readability
-            display_df['Total Bookings'] = display_df['Total Bookings'].apply(lambda x: f"{x:,}")
-            display_df['Total Guests'] = display_df['Total Guests'].apply(lambda x: f"{x:,}")
-            display_df['Total Nights'] = display_df['Total Nights'].apply(lambda x: f"{x:,}")
-            
             # Download section
             _, col2, _ = st.columns([1, 1, 1])
             with col2:
-                csv_buffer = io.StringIO()
-                display_df.to_csv(csv_buffer, index=False)
                 st.download_button(
                     label="Download Analysis Results",
-                    data=csv_buffer.getvalue(),
+                    data=to_csv_bytes(display_df),
                     file_name=f"booking_analysis_{uploaded_file.name}",
                     mime="text/csv",
                     use_container_width=True
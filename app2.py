@@ -3,6 +3,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import io
 import base64
+import re
 from matplotlib.backends.backend_pdf import PdfPages
 
 # Configure page
@@ -12,30 +13,22 @@ st.set_page_config(
     layout="wide"
 )
 
+# Week labels look like "Week XX 20XX"
+_WEEK_RE = re.compile(r'^\s*Week\s+(\d+)\s+(\d{4})')
+
 def process_data(df, time_period):
     time_column = 'Booking Week' if time_period == 'Week' else 'Booking Month'
     
     # Convert to datetime for proper sorting
     if time_period == 'Week':
         # Handle week format: "Week XX 20XX"
-        def parse_week(week_str):
-            try:
-                if pd.isna(week_str):
-                    return pd.NaT
-                # Extract week number and year from "Week XX 20XX" format
-                import re
-                match = re.match(r'Week\s+(\d+)\s+(\d{4})', str(week_str).strip())
-                if match:
-                    week_num = int(match.group(1))
-                    year = int(match.group(2))
-                    # Create datetime from year and week number
-                    return pd.to_datetime(f'{year}-W{week_num:02d}-1', format='%Y-W%W-%w')
-                else:
-                    return pd.NaT
-            except:
-                return pd.NaT
-        
-        df['Time_Date'] = df[time_column].apply(parse_week)
+        # Extract week number and year for all rows at once
+        parts = df[time_column].astype(str).str.extract(_WEEK_RE)
+        # Create datetimes from year and week number in one vectorized call;
+        # out-of-range weeks become NaT, and repeated week strings are parsed
+        # once thanks to the format cache
+        iso_strings = parts[1] + '-W' + parts[0].str.lstrip('0').str.zfill(2) + '-1'
+        df['Time_Date'] = pd.to_datetime(iso_strings, format='%Y-W%W-%w', errors='coerce', cache=True)
     else:
         df['Time_Date'] = pd.to_datetime(df[time_column], format='%b %Y', errors='coerce')
     
@@ -62,7 +55,12 @@ def process_data(df, time_period):
 
     return pivot_table, df_sorted, time_column
 
-def create_visualizations(pivot_table, df, time_period):
+@st.cache_data(show_spinner=False)
+def get_status_totals(df):
+    """Count bookings per status"""
+    return df['Booking Status'].value_counts()
+
+def create_visualizations(pivot_table, df, time_period, status_totals):
     # Modern color palette
     colors = {
         'Cancelled': '#FF8A95',
@@ -124,9 +122,6 @@ def create_visualizations(pivot_table, df, time_period):
     axes[1,0].legend(frameon=True, fancybox=True, shadow=True, framealpha=0.9)
 
     # 4. Donut chart
-    status_totals = df['Booking Status'].value_counts()
-    # 4. Donut chart
-    status_totals = df['Booking Status'].value_counts()
     pie_colors = [colors.get(status, '#CCCCCC') for status in status_totals.index]
 
     _, _, autotexts = axes[1,1].pie(status_totals.values, labels=status_totals.index, 
@@ -153,22 +148,29 @@ def create_visualizations(pivot_table, df, time_period):
     
     return fig
 
-def fig_to_base64(fig):
-    """Convert matplotlib figure to base64 string for copying"""
+@st.cache_data(show_spinner=False, max_entries=8)
+def fig_to_base64(pivot_table, df, time_period, status_totals):
+    """Render the dashboard figure to a base64 PNG string for copying"""
+    fig = create_visualizations(pivot_table, df, time_period, status_totals)
     img_buffer = io.BytesIO()
     fig.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight', 
                 facecolor='white', edgecolor='none')
+    plt.close(fig)
     img_buffer.seek(0)
     img_str = base64.b64encode(img_buffer.getvalue()).decode()
     return img_str
 
-def create_pdf_download(fig):
-    """Create PDF download button"""
+@st.cache_data(show_spinner=False, max_entries=8)
+def create_pdf_download(pivot_table, df, time_period, status_totals):
+    """Render the dashboard figure to PDF bytes for download"""
+    fig = create_visualizations(pivot_table, df, time_period, status_totals)
     pdf_buffer = io.BytesIO()
     with PdfPages(pdf_buffer) as pdf:
         pdf.savefig(fig, bbox_inches='tight', dpi=300)
+    plt.close(fig)
     pdf_buffer.seek(0)
     return pdf_buffer.getvalue()
+
 st.title("📊 Booking Analysis Dashboard")
 st.markdown("Upload your CSV file to analyze booking data")
 
@@ -201,8 +203,9 @@ if uploaded_file is not None:
                 st.info(f"Expected format for {time_column}: {'Week format like \"Week 1 2024\"' if time_period == 'Week' else 'Month format like \"Jan 2024\"'}")
             else:
                 # Calculate summary statistics
-                status_totals = df['Booking Status'].value_counts()
+                status_totals = get_status_totals(df)
                 total_bookings = len(df)
+                confirmed, cancelled, rejected = status_totals.reindex(['Confirmed', 'Cancelled', 'Rejected'], fill_value=0).to_numpy()
                 
                 # Display summary statistics
                 st.header("📈 Summary Statistics")
@@ -211,22 +214,21 @@ if uploaded_file is not None:
                 with col1:
                     st.metric("Total Bookings", total_bookings)
                 with col2:
-                    confirmed = status_totals.get('Confirmed', 0)
                     confirmed_pct = (confirmed/total_bookings*100) if total_bookings > 0 else 0
                     st.metric("Confirmed", f"{confirmed}", f"{confirmed_pct:.1f}%")
                 with col3:
-                    cancelled = status_totals.get('Cancelled', 0)
                     cancelled_pct = (cancelled/total_bookings*100) if total_bookings > 0 else 0
                     st.metric("Cancelled", f"{cancelled}", f"{cancelled_pct:.1f}%")
                 with col4:
-                    rejected = status_totals.get('Rejected', 0)
                     rejected_pct = (rejected/total_bookings*100) if total_bookings > 0 else 0
                     st.metric("Rejected", f"{rejected}", f"{rejected_pct:.1f}%")
                 
                 # Create and display visualizations
                 st.header("📊 Visualizations")
-                fig = create_visualizations(pivot_table, df_processed, time_period)
-                st.pyplot(fig)
+                # Figures are rendered once per input and served from the PNG cache
+                fig_inputs = (pivot_table, df_processed, time_period, get_status_totals(df_processed))
+                img_base64 = fig_to_base64(*fig_inputs)
+                st.image(base64.b64decode(img_base64), use_container_width=True)
                 
                 # Download Options
                 st.header("💾 Download Options")
@@ -234,7 +236,6 @@ if uploaded_file is not None:
                 
                 with col1:
                     # Copy image button
-                    img_base64 = fig_to_base64(fig)
                     st.markdown(
                         f"""
                         <button onclick="navigator.clipboard.writeText('data:image/png;base64,{img_base64}')">
@@ -252,7 +253,7 @@ if uploaded_file is not None:
                 
                 with col2:
                     # PDF download button
-                    pdf_data = create_pdf_download(fig)
+                    pdf_data = create_pdf_download(*fig_inputs)
                     st.download_button(
                         label="📄 Download as PDF",
                         data=pdf_data,